@@ -4,17 +4,36 @@ LittleFS Browser - Flask Web Interface
 A professional tool for browsing LittleFS filesystems from embedded devices
 """
 
+import collections
+import contextlib
+import errno
+import functools
+import json
 import logging
 import os
+import re
+import selectors
 import shutil
+import sqlite3
+import stat
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+from urllib.parse import quote
+from typing import Dict, Iterator, List, Optional, Any, Set, Tuple, Union
 
-from flask import Flask, render_template_string, jsonify, send_file, request, send_from_directory
+from flask import (
+    Flask, Response, jsonify, send_file, request,
+    send_from_directory, stream_with_context
+)
 from flask_cors import CORS
+from jinja2 import Template
 
 # Configure logging
 logging.basicConfig(
@@ -25,14 +44,65 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def is_valid_lfs_geometry(params: Dict[str, int]) -> bool:
+    """Check a parameter set against the geometry rules enforced by lfs_init
+
+    Args:
+        params: LittleFS configuration dictionary
+
+    Returns:
+        True if littlefs would accept the configuration, False otherwise
+    """
+    read_size = params['read_size']
+    prog_size = params['prog_size']
+    cache_size = params.get('cache_size', 64)
+    lookahead_size = params.get('lookahead_size', 32)
+
+    if min(read_size, prog_size, cache_size, lookahead_size) <= 0:
+        return False
+
+    return (
+        cache_size % read_size == 0
+        and cache_size % prog_size == 0
+        and params['block_size'] % cache_size == 0
+        and lookahead_size % 8 == 0
+    )
+
+
 @dataclass
 class Config:
     """Application configuration"""
     MOUNT_BASE: str = "/tmp/littlefs_mounts"
+    MOUNT_REGISTRY_PATH: str = "/run/littlefs-browser/mounts.db"
     DEFAULT_EXPORT_PATH: str = "~/Downloads/littlefs_export"
-    MOUNT_TIMEOUT: float = 0.5
+    COPY_BUFFER_SIZE: int = 1024 * 1024
+    DOWNLOAD_BUFFER_SIZE: int = 1024 * 1024
+    EXTRACT_WORKERS: int = 16
+    LISTING_WORKERS: int = 8
+    LIST_BATCH_SIZE: int = 64
+
+    # Internal nginx location aliased to MOUNT_BASE; when set, downloads
+    # are handed to nginx with X-Accel-Redirect instead of sent by Flask
+    X_ACCEL_REDIRECT_PREFIX: Optional[str] = os.environ.get('LITTLEFS_X_ACCEL_REDIRECT')
+
+    # Hand downloads to a front-end server that honours X-Sendfile (Apache
+    # mod_xsendfile, lighttpd) by path instead of streaming them from Flask
+    X_SENDFILE: bool = os.environ.get('LITTLEFS_X_SENDFILE', '') not in ('', '0')
+
+    # The debugger and reloader stay on unless explicitly run in production
+    DEBUG: bool = os.environ.get('FLASK_ENV', 'development') != 'production'
+    MOUNT_TIMEOUT: float = 2.0
+    MOUNT_POLL_INTERVAL: float = 0.01
     CLEANUP_ATTEMPTS: int = 3
-    DETECTION_TIMEOUT: float = 0.5
+    CLEANUP_RETRY_DELAY: float = 0.05
+    PROCESS_STOP_TIMEOUT: float = 0.5
+    CLEANUP_WORKERS: int = 8
+    UNMOUNT_TIMEOUT: float = 0.2
+    DETECTION_DEADLINE: float = 10.0
+    DETECTION_WORKERS: int = 8
+    DETECTION_MOUNT_PREFIX: str = "littlefs_probe_"
+    DEVICE_CACHE_TTL: float = 1.0
+    LFS_BINARY: str = "lfs"
 
     # Common LittleFS configurations for auto-detection
     COMMON_CONFIGS: List[Dict[str, int]] = None
@@ -50,6 +120,14 @@ class Config:
                 {'block_size': 4096, 'read_size': 256, 'prog_size': 256, 'cache_size': 256, 'lookahead_size': 32},
             ]
 
+        # Every candidate costs a probe mount, so drop geometries littlefs
+        # would reject outright along with any duplicates
+        valid_configs = []
+        for params in self.COMMON_CONFIGS:
+            if is_valid_lfs_geometry(params) and params not in valid_configs:
+                valid_configs.append(params)
+        self.COMMON_CONFIGS = valid_configs
+
 
 # Error messages
 ERROR_DEVICE_NOT_MOUNTED = "Device not mounted"
@@ -58,13 +136,264 @@ ERROR_DEVICE_ALREADY_MOUNTED = "Device already mounted"
 ERROR_PATH_NOT_FOUND = "Path not found"
 ERROR_FILE_NOT_FOUND = "File not found"
 ERROR_FAILED_TO_UNMOUNT = "Failed to unmount"
+ERROR_LFS_NOT_FOUND = "lfs binary not found (is littlefs-fuse installed?)"
+
+class MountRegistry:
+    """Active mounts, shared between worker processes through SQLite
+
+    Each row maps a device to its mount point and the parameters it was
+    mounted with. A row is claimed before mounting, so two workers cannot
+    mount the same device, and only counts as mounted once activated. WAL
+    mode lets any worker read the table while another one writes.
+
+    Connections are pooled rather than shared, so concurrent request
+    threads query the table side by side instead of queueing on one
+    connection; SQLite itself keeps the claim atomic.
+
+    The table decides what gets unmounted and which directories are served,
+    so the database must live in a directory only this user can write, and
+    rows pointing anywhere but directly under the mount base are ignored.
+    """
+
+    def __init__(self, db_path: str, mount_base: str):
+        self.db_path = db_path
+        self.mount_base = os.path.normpath(mount_base)
+        self._lock = threading.Lock()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_pid: Optional[int] = None
+
+    def _check_storage(self) -> None:
+        """Make sure no other user can have written the database
+
+        Raises:
+            PermissionError: If the database directory or file is not owned
+                by this user, or the directory is writable by others
+        """
+        directory = os.path.dirname(self.db_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        uid = os.geteuid()
+
+        st = os.lstat(directory)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or st.st_mode & 0o022:
+            raise PermissionError(
+                f"Mount registry directory {directory} must be owned by uid {uid} "
+                "and not writable by other users"
+            )
+
+        try:
+            st = os.lstat(self.db_path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISREG(st.st_mode) or st.st_uid != uid:
+            raise PermissionError(
+                f"Mount registry {self.db_path} must be a regular file owned by uid {uid}"
+            )
+
+    def _is_managed(self, mount_point: str) -> bool:
+        """Check that a mount point is one this app creates under the mount base"""
+        return os.path.dirname(os.path.normpath(mount_point)) == self.mount_base
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection, creating the table if needed"""
+        self._check_storage()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=10,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS mounts ('
+            'device_path TEXT PRIMARY KEY, '
+            'mount_point TEXT NOT NULL, '
+            'params TEXT, '
+            'owner_pid INTEGER)'
+        )
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for the duration of a query
+
+        Connections are not shared across fork, so a worker forked from a
+        preloaded app starts a pool of its own and prunes stale rows the
+        first time it connects.
+        """
+        with self._lock:
+            if self._pool_pid != os.getpid():
+                self._pool = []
+                self._pool_pid = os.getpid()
+                conn = self._open()
+                self._prune(conn)
+            elif self._pool:
+                conn = self._pool.pop()
+            else:
+                conn = None
+
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if self._pool_pid == os.getpid():
+                    self._pool.append(conn)
+
+    @staticmethod
+    def _is_process_alive(pid: Optional[int]) -> bool:
+        """Check whether the worker that claimed a device is still running"""
+        if pid is None:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop rows whose filesystem is no longer mounted
+
+        lfs daemonizes once the mount is up, so the pid that started it is
+        gone by then; whether the mount point is still a mount is what
+        tells a live mount from a stale one. A claim that is not activated
+        yet may belong to another worker still detecting or mounting, so it
+        is only dropped once the worker that made it has exited.
+        """
+        rows = conn.execute(
+            'SELECT device_path, mount_point, params, owner_pid FROM mounts'
+        ).fetchall()
+        for device_path, mount_point, params, owner_pid in rows:
+            if not self._is_managed(mount_point):
+                stale = True
+            elif params is None:
+                stale = not self._is_process_alive(owner_pid)
+            else:
+                stale = not os.path.ismount(mount_point)
+            if stale:
+                conn.execute('DELETE FROM mounts WHERE device_path = ?', (device_path,))
+                logger.info("Dropped stale mount record for %s", device_path)
+
+    def get(self, device_path: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up an active mount
+
+        Args:
+            device_path: Path to the block device
+
+        Returns:
+            Dictionary with 'mount_point' and 'params', or None if the
+            device is not mounted
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT mount_point, params FROM mounts '
+                'WHERE device_path = ? AND params IS NOT NULL',
+                (device_path,)
+            ).fetchone()
+        if row is None:
+            return None
+        if not self._is_managed(row[0]):
+            logger.warning("Ignoring mount record for %s outside %s: %s",
+                           device_path, self.mount_base, row[0])
+            return None
+        return {'mount_point': row[0], 'params': json.loads(row[1])}
+
+    def __contains__(self, device_path: Optional[str]) -> bool:
+        return self.get(device_path) is not None
+
+    def claim(self, device_path: str, mount_point: str) -> bool:
+        """Reserve a device before mounting it
+
+        Args:
+            device_path: Path to the block device
+            mount_point: Path the device will be mounted at
+
+        Returns:
+            True if the device was free, False if it is mounted or being
+            mounted already
+        """
+        with self._connection() as conn:
+            try:
+                conn.execute(
+                    'INSERT INTO mounts (device_path, mount_point, owner_pid) VALUES (?, ?, ?)',
+                    (device_path, mount_point, os.getpid())
+                )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def activate(self, device_path: str, mount_point: str, params: Dict[str, int]) -> None:
+        """Record a claimed device as mounted
+
+        Args:
+            device_path: Path to the block device
+            mount_point: Path the device is mounted at
+            params: LittleFS parameters the device was mounted with
+        """
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO mounts (device_path, mount_point, params) VALUES (?, ?, ?)',
+                (device_path, mount_point, json.dumps(params))
+            )
+
+    def remove(self, device_path: str) -> None:
+        """Forget a device, whether it was claimed or mounted
+
+        Args:
+            device_path: Path to the block device
+        """
+        with self._connection() as conn:
+            conn.execute('DELETE FROM mounts WHERE device_path = ?', (device_path,))
+
+
+# Kernel block device tree used for device scanning
+SYS_BLOCK = "/sys/block"
+
+# littlefs v2 superblock layout at the start of blocks 0 and 1: a 32-bit
+# revision count and the superblock tag, the "littlefs" magic, the inline
+# struct tag, then version, block_size and block_count as little-endian u32s
+LFS_MAGIC = b"littlefs"
+LFS_MAGIC_OFFSET = 8
+LFS_SUPERBLOCK_STRUCT = struct.Struct('<III')
+LFS_SUPERBLOCK_STRUCT_OFFSET = 20
+LFS_SUPERBLOCK_HEADER_SIZE = LFS_SUPERBLOCK_STRUCT_OFFSET + LFS_SUPERBLOCK_STRUCT.size
+LFS_DISK_VERSION_MAJOR = 2
+
+# Read/prog geometry used when the superblock's block size matches no common config
+LFS_FALLBACK_GEOMETRY = {'read_size': 16, 'prog_size': 16, 'cache_size': 64, 'lookahead_size': 32}
+
+# Parsers for lsblk -P output and the \xNN escapes udev and lsblk emit
+LSBLK_PAIR_RE = re.compile(r'([A-Z:-]+)="([^"]*)"')
+HEX_ESCAPE_RE = re.compile(r'\\x([0-9a-fA-F]{2})')
+
+# Compact encoder for the hand-assembled /api/list stream
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+# Serializes device scans so concurrent callers share one scan, and holds
+# the most recent scan with the monotonic time it finished
+_device_scan_lock = threading.Lock()
+_device_cache: Optional[Tuple[float, Tuple[Dict[str, Any], ...]]] = None
+
+# lfs binary resolved on first use, so each spawn skips the PATH search
+_lfs_path: Optional[str] = None
+
+# Detections currently running, so concurrent callers share their result
+_detection_lock = threading.Lock()
+_detections_in_flight: Dict[str, Future] = {}
 
 # Application state
 config = Config()
-active_mounts: Dict[str, Dict[str, Any]] = {}
+active_mounts = MountRegistry(config.MOUNT_REGISTRY_PATH, config.MOUNT_BASE)
+detected_params: Dict[str, Dict[str, int]] = {}
 
 # Flask app
 app = Flask(__name__, static_folder='frontend/dist', static_url_path='')
+# Responses are read by the UI, not people: skip key sorting and the
+# indentation debug mode would otherwise add
+app.json.sort_keys = False
+app.json.compact = True
 CORS(app)
 
 
@@ -73,6 +402,71 @@ def ensure_mount_dir() -> None:
     os.makedirs(config.MOUNT_BASE, exist_ok=True)
 
 
+def get_lfs_path() -> str:
+    """Resolve the lfs binary, searching PATH only until it is found
+
+    Returns:
+        Absolute path to the lfs binary
+
+    Raises:
+        FileNotFoundError: If lfs is not installed
+    """
+    global _lfs_path
+
+    if _lfs_path is None:
+        path = shutil.which(config.LFS_BINARY)
+        if path is None:
+            raise FileNotFoundError(ERROR_LFS_NOT_FOUND)
+        _lfs_path = path
+    return _lfs_path
+
+
+@functools.lru_cache(maxsize=64)
+def lfs_geometry_args(block_size: int, read_size: int, prog_size: int,
+                      cache_size: int, lookahead_size: int) -> Tuple[str, ...]:
+    """Format the lfs geometry options once per distinct geometry
+
+    Args:
+        block_size: Erase block size in bytes
+        read_size: Minimum read size in bytes
+        prog_size: Minimum program size in bytes
+        cache_size: Block cache size in bytes
+        lookahead_size: Lookahead buffer size in bytes
+
+    Returns:
+        Tuple of lfs command-line options
+    """
+    return (
+        f'--block_size={block_size}',
+        f'--read_size={read_size}',
+        f'--prog_size={prog_size}',
+        f'--cache_size={cache_size}',
+        f'--lookahead_size={lookahead_size}',
+        '-o', 'allow_other',
+    )
+
+
+def build_lfs_command(device_path: str, mount_point: str, params: Dict[str, int]) -> List[str]:
+    """Build the lfs command line that mounts a device
+
+    Args:
+        device_path: Path to the block device
+        mount_point: Directory to mount on
+        params: LittleFS configuration to mount with
+
+    Returns:
+        Argument list for subprocess
+    """
+    options = lfs_geometry_args(
+        params['block_size'],
+        params['read_size'],
+        params['prog_size'],
+        params.get('cache_size', 64),
+        params.get('lookahead_size', 32),
+    )
+    return [get_lfs_path(), *options, device_path, mount_point]
+
+
 def unmount_fuse(mount_point: str) -> bool:
     """Unmount a FUSE filesystem
 
@@ -96,6 +490,160 @@ def unmount_fuse(mount_point: str) -> bool:
             return False
 
 
+def wait_for_mount(mount_point: str, proc: subprocess.Popen, timeout: float,
+                   cancelled: Optional[threading.Event] = None,
+                   output: Optional[bytearray] = None) -> bool:
+    """Wait for a FUSE daemon to take over a mount point
+
+    Blocks on the lfs process's stderr rather than sleeping between checks.
+    lfs mounts before it daemonizes, and daemonizing closes its end of the
+    pipe, so EOF on stderr means the mount is ready or lfs has exited. An
+    empty, unmounted directory is still listable, which is why os.listdir
+    cannot serve as the check; os.path.ismount is used instead.
+
+    Args:
+        mount_point: Directory the filesystem is being mounted on
+        proc: The lfs process performing the mount, started with stderr piped
+        timeout: Maximum time to wait in seconds
+        cancelled: Optional event that aborts the wait when set
+        output: Optional buffer that receives anything lfs writes to stderr
+
+    Returns:
+        True if the filesystem is mounted, False otherwise
+    """
+    deadline = time.monotonic() + timeout
+    selector = selectors.DefaultSelector()
+    stderr_open = proc.stderr is not None
+    if stderr_open:
+        selector.register(proc.stderr, selectors.EVENT_READ)
+
+    try:
+        while True:
+            if os.path.ismount(mount_point):
+                return True
+
+            # lfs exits with 0 once it daemonizes; any other exit is a failed mount
+            returncode = proc.poll()
+            if returncode is not None and returncode != 0:
+                return False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            # A cancel event can't be selected on, so check it between slices
+            if stderr_open and cancelled is None:
+                delay = remaining
+            else:
+                delay = min(config.MOUNT_POLL_INTERVAL, remaining)
+
+            if stderr_open:
+                if selector.select(delay):
+                    chunk = os.read(proc.stderr.fileno(), 4096)
+                    if chunk:
+                        if output is not None:
+                            output.extend(chunk)
+                    else:
+                        # Fall back to polling if lfs is done but the mount
+                        # isn't visible yet
+                        selector.unregister(proc.stderr)
+                        stderr_open = False
+                        try:
+                            proc.wait(timeout=max(deadline - time.monotonic(), 0))
+                        except subprocess.TimeoutExpired:
+                            pass
+                if cancelled is not None and cancelled.is_set():
+                    return False
+            elif cancelled is None:
+                time.sleep(delay)
+            elif cancelled.wait(delay):
+                return False
+    finally:
+        selector.close()
+
+
+def wait_for_unmount(mount_point: str, timeout: float) -> bool:
+    """Wait for a mount point to stop being a mount
+
+    Args:
+        mount_point: Path to the mount point
+        timeout: Maximum time to wait in seconds
+
+    Returns:
+        True if nothing is mounted there any more, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = config.MOUNT_POLL_INTERVAL
+
+    # Lazy unmounts usually finish at once; back off if this one doesn't
+    while os.path.ismount(mount_point):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay *= 2
+    return True
+
+
+def stop_process(proc: subprocess.Popen) -> None:
+    """Terminate a process and reap it, killing it if it ignores SIGTERM
+
+    Args:
+        proc: Process to stop
+    """
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=config.PROCESS_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def remove_tree(path: str) -> None:
+    """Delete a directory tree, unlinking its files on a thread pool
+
+    The tree is walked once with os.scandir, the files are unlinked
+    concurrently and the directories are then removed bottom-up. The walk
+    never crosses into another filesystem: a tree that is itself still a
+    mount is refused, so a failed unmount can't delete the files on the
+    device, and directories mounted inside it are left in place.
+
+    Args:
+        path: Directory to delete
+
+    Raises:
+        OSError: If the tree is a mount or could not be fully removed
+    """
+    root_dev = os.lstat(path).st_dev
+    if root_dev != os.lstat(os.path.dirname(os.path.abspath(path))).st_dev:
+        raise OSError(errno.EBUSY, "Refusing to delete a mounted filesystem", path)
+
+    files = []
+    dirs = []
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        dirs.append(current)
+        with os.scandir(current) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    files.append(entry.path)
+                elif entry.stat(follow_symlinks=False).st_dev == root_dev:
+                    pending.append(entry.path)
+
+    if files:
+        with ThreadPoolExecutor(max_workers=config.CLEANUP_WORKERS) as executor:
+            # Consuming the results re-raises the first failed unlink
+            for _ in executor.map(os.unlink, files):
+                pass
+
+    # Every directory was collected before its subdirectories
+    for directory in reversed(dirs):
+        os.rmdir(directory)
+
+
 def force_cleanup_mount_point(mount_point: str) -> bool:
     """Forcefully clean up a mount point
 
@@ -105,65 +653,81 @@ def force_cleanup_mount_point(mount_point: str) -> bool:
     Returns:
         True if cleanup succeeded, False otherwise
     """
-    if not os.path.exists(mount_point):
+    # lstat rather than os.path.exists: a FUSE mount whose daemon died
+    # fails with ENOTCONN, which exists() would report as already gone
+    try:
+        os.lstat(mount_point)
+    except FileNotFoundError:
         return True
+    except OSError:
+        pass
 
     logger.info("Attempting to clean up mount point: %s", mount_point)
 
-    # Try unmounting multiple times with different methods
+    # Try fusermount first and fall back to umount only if it did not work
     unmount_commands = [
         ['fusermount', '-uz', mount_point],
         ['umount', '-l', mount_point],
     ]
 
-    for cmd in unmount_commands:
-        try:
-            result = subprocess.run(cmd, capture_output=True, timeout=2)
-            if result.returncode == 0:
-                logger.debug("Unmounted using: %s", ' '.join(cmd))
-            time.sleep(0.1)
-        except Exception:
-            continue
+    if mount_point in get_mount_points():
+        for cmd in unmount_commands:
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=2)
+                if result.returncode == 0:
+                    logger.debug("Unmounted using: %s", ' '.join(cmd))
+                    wait_for_unmount(mount_point, config.UNMOUNT_TIMEOUT)
+                    break
+            except Exception:
+                continue
 
-    # Try to remove directory
+    # Try to remove directory, stat'ing it once per attempt
     for attempt in range(config.CLEANUP_ATTEMPTS):
         try:
-            if not os.path.exists(mount_point):
+            try:
+                st = os.lstat(mount_point)
+            except FileNotFoundError:
                 return True
 
-            if os.path.isdir(mount_point):
-                # First try normal removal
+            if stat.S_ISDIR(st.st_mode):
+                # First try normal removal; rmdir itself reports whether the
+                # directory was empty, without enumerating it through FUSE
                 try:
-                    if not os.listdir(mount_point):  # If empty
-                        os.rmdir(mount_point)
-                        logger.debug("Removed empty directory")
-                        return True
-                except OSError:
-                    pass
+                    os.rmdir(mount_point)
+                    logger.debug("Removed empty directory")
+                    return True
+                except OSError as e:
+                    if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                        logger.debug("rmdir failed: %s", e)
 
                 # Try force removal
                 try:
-                    shutil.rmtree(mount_point, ignore_errors=False)
-                    if not os.path.exists(mount_point):
-                        logger.debug("Force removed directory")
-                        return True
+                    remove_tree(mount_point)
+                    logger.debug("Force removed directory")
+                    return True
                 except Exception as e:
                     logger.debug("Attempt %d/%d failed: %s", attempt + 1, config.CLEANUP_ATTEMPTS, e)
 
-            elif os.path.isfile(mount_point):
+            else:
                 os.remove(mount_point)
                 return True
 
-            time.sleep(0.2)
+            # Back off exponentially, and don't sleep after the last attempt
+            if attempt + 1 < config.CLEANUP_ATTEMPTS:
+                time.sleep(config.CLEANUP_RETRY_DELAY * 2 ** attempt)
         except Exception as e:
             if attempt == config.CLEANUP_ATTEMPTS - 1:
                 logger.warning("Failed to remove after %d attempts: %s", attempt + 1, e)
 
     # Last resort: check if it's actually gone
-    exists = os.path.exists(mount_point)
-    if exists:
-        logger.warning("Mount point still exists: %s", mount_point)
-    return not exists
+    try:
+        os.lstat(mount_point)
+    except FileNotFoundError:
+        return True
+    except OSError:
+        pass
+    logger.warning("Mount point still exists: %s", mount_point)
+    return False
 
 
 def cleanup_stale_mounts() -> None:
@@ -172,19 +736,41 @@ def cleanup_stale_mounts() -> None:
         return
 
     logger.info("Checking for stale mounts...")
-    items = os.listdir(config.MOUNT_BASE)
+    # The entry type comes from readdir, so a dead FUSE mount, which can't
+    # be stat'ed, is still recognised as a directory
+    with os.scandir(config.MOUNT_BASE) as it:
+        entries = list(it)
 
-    if not items:
+    if not entries:
         logger.info("No stale mounts found")
         return
 
     cleaned = 0
     failed = []
 
-    for item in items:
-        mount_point = os.path.join(config.MOUNT_BASE, item)
-        if os.path.isdir(mount_point):
-            if force_cleanup_mount_point(mount_point):
+    mount_points = [
+        entry.path
+        for entry in entries
+        if entry.is_dir(follow_symlinks=False)
+    ]
+
+    # Detach every stale mount with a single umount call; the per-directory
+    # cleanup below then only has to remove directories
+    mounted = get_mount_points()
+    stale = [mp for mp in mount_points if mp in mounted]
+    if stale:
+        try:
+            subprocess.run(['umount', '-l', *stale], capture_output=True, timeout=5)
+        except Exception as e:
+            logger.debug("Batch unmount failed: %s", e)
+
+    # Anything still mounted is retried per directory, side by side
+    with ThreadPoolExecutor(max_workers=config.CLEANUP_WORKERS) as executor:
+        results = executor.map(force_cleanup_mount_point, mount_points)
+
+        for mount_point, success in zip(mount_points, results):
+            item = os.path.basename(mount_point)
+            if success:
                 cleaned += 1
                 logger.info("✓ Cleaned: %s", item)
             else:
@@ -202,6 +788,264 @@ def cleanup_stale_mounts() -> None:
         logger.warning("Or use the cleanup script: sudo ./cleanup_mounts.sh")
 
 
+def read_sysfs_attr(path: str, default: str = '') -> str:
+    """Read a single sysfs attribute
+
+    Args:
+        path: Path to the attribute file
+        default: Value returned if the attribute cannot be read
+
+    Returns:
+        The stripped attribute value
+    """
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def decode_hex_escapes(value: str) -> str:
+    """Decode the \\xNN escapes used by udev and lsblk
+
+    Args:
+        value: Escaped string
+
+    Returns:
+        The decoded string
+    """
+    return HEX_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 16)), value)
+
+
+def unescape_mount_path(path: str) -> str:
+    """Undo the octal escapes the kernel uses for whitespace in mount paths
+
+    Args:
+        path: Path field from /proc/mounts, mountinfo or swaps (e.g. a\\040b)
+
+    Returns:
+        The unescaped path
+    """
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), path)
+
+
+def read_proc_mounts() -> List[Tuple[str, str]]:
+    """Read the kernel mount table
+
+    Returns:
+        List of (source, mount point) pairs from /proc/mounts
+    """
+    entries = []
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2:
+                    entries.append((fields[0], unescape_mount_path(fields[1])))
+    except OSError as e:
+        logger.debug("Could not read /proc/mounts: %s", e)
+    return entries
+
+
+def get_mount_table() -> Dict[str, str]:
+    """Find which block devices are in use, and where
+
+    Devices are matched by device number, as lsblk does, so a root
+    filesystem the kernel lists as /dev/root is still recognised. Active
+    swap devices are reported as mounted on [SWAP].
+
+    Returns:
+        Dictionary mapping device numbers ("major:minor") and device paths
+        (e.g. /dev/mmcblk0p1) to mount points
+    """
+    mounts = {}
+    try:
+        with open('/proc/self/mountinfo', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 5:
+                    continue
+                mount_point = unescape_mount_path(fields[4])
+                mounts.setdefault(fields[2], mount_point)
+                # The source follows the "-" separator; matching it by path
+                # too covers filesystems with anonymous device numbers (btrfs)
+                if '-' in fields[5:]:
+                    source_index = fields.index('-', 5) + 2
+                    if source_index < len(fields) and fields[source_index].startswith('/dev/'):
+                        mounts.setdefault(fields[source_index], mount_point)
+    except OSError as e:
+        logger.debug("Could not read /proc/self/mountinfo: %s", e)
+
+    try:
+        with open('/proc/swaps', 'r') as f:
+            next(f, None)  # column headers
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                try:
+                    st = os.stat(unescape_mount_path(fields[0]))
+                except OSError:
+                    continue
+                if stat.S_ISBLK(st.st_mode):
+                    mounts.setdefault(f"{os.major(st.st_rdev)}:{os.minor(st.st_rdev)}", '[SWAP]')
+    except OSError as e:
+        logger.debug("Could not read /proc/swaps: %s", e)
+
+    return mounts
+
+
+def get_mount_points() -> Set[str]:
+    """Collect every active mount point
+
+    Unlike os.path.ismount, this also reports FUSE mounts whose daemon has
+    died, which fail lstat with ENOTCONN.
+
+    Returns:
+        Set of mount point paths
+    """
+    return {mount_point for _, mount_point in read_proc_mounts()}
+
+
+def get_device_labels() -> Dict[str, str]:
+    """Map device names to filesystem labels using the udev by-label links
+
+    Returns:
+        Dictionary mapping device names (e.g. mmcblk0p1) to labels
+    """
+    labels = {}
+    by_label = '/dev/disk/by-label'
+    try:
+        for link in os.listdir(by_label):
+            target = os.path.basename(os.path.realpath(os.path.join(by_label, link)))
+            # udev escapes unsafe characters as \xNN
+            labels[target] = decode_hex_escapes(link)
+    except OSError:
+        pass
+    return labels
+
+
+def is_hotplug_device(sys_path: str) -> bool:
+    """Check whether any parent of a block device sits on a hotpluggable port
+
+    Args:
+        sys_path: Resolved /sys/devices path of the block device
+
+    Returns:
+        True if a parent device reports itself as removable
+    """
+    path = sys_path
+    while path.startswith('/sys/devices/'):
+        if read_sysfs_attr(os.path.join(path, 'removable')) == 'removable':
+            return True
+        path = os.path.dirname(path)
+    return False
+
+
+def scan_sysfs_block_devices() -> List[Dict[str, Any]]:
+    """Enumerate disks and partitions directly from /sys/block
+
+    Returns:
+        List of raw device dictionaries with name, type, size (bytes),
+        mountpoint, label, rm and hotplug keys
+    """
+    mounts = get_mount_table()
+    labels = get_device_labels()
+    devices = []
+
+    for name in sorted(os.listdir(SYS_BLOCK)):
+        disk_dir = os.path.join(SYS_BLOCK, name)
+        sys_path = os.path.realpath(disk_dir)
+        removable = read_sysfs_attr(os.path.join(disk_dir, 'removable')) == '1'
+        # Only removable media or devices on a hotplug port are listed, so
+        # the walk up the parent devices is skipped when the first is known
+        hotplug = removable or is_hotplug_device(sys_path)
+
+        entries = [(name, disk_dir, 'disk')]
+        for child in sorted(os.listdir(disk_dir)):
+            if child.startswith(name) and os.path.exists(os.path.join(disk_dir, child, 'partition')):
+                entries.append((child, os.path.join(disk_dir, child), 'part'))
+
+        for dev_name, dev_dir, dev_type in entries:
+            # sysfs reports sizes in 512-byte sectors regardless of the device
+            sectors = read_sysfs_attr(os.path.join(dev_dir, 'size'), '0')
+            dev_number = read_sysfs_attr(os.path.join(dev_dir, 'dev'))
+            devices.append({
+                'name': dev_name,
+                'type': dev_type,
+                'size': int(sectors) * 512 if sectors.isdigit() else 0,
+                'mountpoint': mounts.get(dev_number) or mounts.get(f"/dev/{dev_name}"),
+                'label': labels.get(dev_name),
+                'rm': removable,
+                'hotplug': hotplug,
+            })
+
+    return devices
+
+
+def scan_lsblk_block_devices() -> List[Dict[str, Any]]:
+    """Enumerate disks and partitions using lsblk (used when sysfs is unavailable)
+
+    Uses the flat key="value" (-P) output, which older util-linux releases
+    without JSON support also provide and which lists partitions inline.
+
+    Returns:
+        List of raw device dictionaries in the same shape as scan_sysfs_block_devices
+    """
+    result = subprocess.run(
+        ['lsblk', '-P', '-b', '-o', 'NAME,SIZE,TYPE,MOUNTPOINT,LABEL,RM,HOTPLUG'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    devices = []
+    for line in result.stdout.splitlines():
+        # lsblk escapes quotes and unsafe characters in values as \xNN
+        fields = {key: decode_hex_escapes(value) for key, value in LSBLK_PAIR_RE.findall(line)}
+        if 'NAME' not in fields:
+            continue
+        size = fields.get('SIZE', '')
+        devices.append({
+            'name': fields['NAME'],
+            'type': fields.get('TYPE', ''),
+            'size': int(size) if size.isdigit() else 0,
+            'mountpoint': fields.get('MOUNTPOINT') or None,
+            'label': fields.get('LABEL') or None,
+            'rm': fields.get('RM') == '1',
+            'hotplug': fields.get('HOTPLUG') == '1',
+        })
+
+    return devices
+
+
+def scan_block_devices() -> Tuple[Dict[str, Any], ...]:
+    """Scan block devices, reusing a scan younger than DEVICE_CACHE_TTL
+
+    Rapid UI polls share a single scan, and callers arriving while one runs
+    wait for it instead of starting another. sysfs is read directly; lsblk
+    is only spawned if that fails.
+
+    Returns:
+        Tuple of raw device dictionaries
+    """
+    global _device_cache
+
+    with _device_scan_lock:
+        now = time.monotonic()
+        if _device_cache is not None and now - _device_cache[0] < config.DEVICE_CACHE_TTL:
+            return _device_cache[1]
+
+        try:
+            scanned = tuple(scan_sysfs_block_devices())
+        except OSError as e:
+            logger.debug("sysfs scan failed, falling back to lsblk: %s", e)
+            scanned = tuple(scan_lsblk_block_devices())
+
+        _device_cache = (time.monotonic(), scanned)
+        return scanned
+
+
 def get_block_devices() -> List[Dict[str, Any]]:
     """Scan for block devices that might contain littlefs
 
@@ -229,16 +1073,7 @@ def get_block_devices() -> List[Dict[str, Any]]:
     ]
 
     try:
-        result = subprocess.run(
-            ['lsblk', '-J', '-o', 'NAME,SIZE,TYPE,MOUNTPOINT,LABEL,RM,HOTPLUG'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        import json
-        data = json.loads(result.stdout)
-
-        for device in data.get('blockdevices', []):
+        for device in scan_block_devices():
             dev_name = device['name']
             dev_path = f"/dev/{dev_name}"
 
@@ -259,20 +1094,17 @@ def get_block_devices() -> List[Dict[str, Any]]:
             if is_included:
                 should_include = True
             elif not is_excluded:
-                # Check if it's removable or hotplug
-                is_removable = device.get('rm', '0') == '1'
-                is_hotplug = device.get('hotplug', '0') == '1'
-                should_include = is_removable or is_hotplug
+                should_include = device['rm'] or device['hotplug']
 
             if should_include:
-                mount = device.get('mountpoint', '')
+                mount = device['mountpoint']
                 # Only show unmounted devices or our own mounts
                 if not mount or config.MOUNT_BASE in mount:
                     devices.append({
                         'path': dev_path,
                         'name': dev_name,
-                        'size': device['size'],
-                        'label': device.get('label', 'Unlabeled'),
+                        'size': format_size(device['size']),
+                        'label': device['label'] or 'Unlabeled',
                         'mounted': dev_path in active_mounts
                     })
     except subprocess.CalledProcessError as e:
@@ -283,82 +1115,305 @@ def get_block_devices() -> List[Dict[str, Any]]:
     return devices
 
 
-def detect_littlefs_params(device_path: str) -> Dict[str, Any]:
-    """Auto-detect LittleFS parameters by trying to mount with common configs
+def probe_littlefs_config(device_path: str, params: Dict[str, int], index: int,
+                          cancelled: threading.Event, deadline: float) -> Optional[Dict[str, int]]:
+    """Try a single LittleFS configuration on a throwaway test mount
 
     Args:
         device_path: Path to the block device
+        params: LittleFS configuration to try
+        index: Probe number, used in the name of the probe's mount point
+        cancelled: Event set once another probe has succeeded
+        deadline: time.monotonic() value after which detection gives up
 
     Returns:
-        Dictionary with 'success' boolean and either 'params' or 'error'
+        The parameters if the device mounted with them, None otherwise
     """
-    test_mount_base = "/tmp/littlefs_test_mount"
+    # Queued probes that only start after the deadline are not worth running
+    if cancelled.is_set() or time.monotonic() >= deadline:
+        return None
 
-    for i, params in enumerate(config.COMMON_CONFIGS, 1):
-        test_mount = f"{test_mount_base}_{i}"
-        try:
-            # Clean up any existing test mount
-            if os.path.exists(test_mount):
-                subprocess.run(['fusermount', '-uz', test_mount], timeout=1, capture_output=True)
-                try:
-                    os.rmdir(test_mount)
-                except OSError:
-                    pass
-
-            os.makedirs(test_mount, exist_ok=True)
-
-            cmd = [
-                'lfs',
-                f'--block_size={params["block_size"]}',
-                f'--read_size={params["read_size"]}',
-                f'--prog_size={params["prog_size"]}',
-                f'--cache_size={params.get("cache_size", 64)}',
-                f'--lookahead_size={params.get("lookahead_size", 32)}',
-                '-o', 'allow_other',
-                device_path,
-                test_mount
-            ]
+    device_name = os.path.basename(device_path)
+    test_mount = None
+    proc = None
 
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            time.sleep(config.DETECTION_TIMEOUT)
+    try:
+        # A private, unpredictable mount point: probes from another worker
+        # process detecting the same device can't collide with this one
+        test_mount = tempfile.mkdtemp(prefix=f"{config.DETECTION_MOUNT_PREFIX}{device_name}_{index}_")
 
-            # Check if mount succeeded by testing accessibility
-            try:
-                os.listdir(test_mount)
+        cmd = build_lfs_command(device_path, test_mount, params)
 
-                # Success! Clean up and return
-                if proc.poll() is None:
-                    proc.terminate()
-                    time.sleep(0.2)
-                subprocess.run(['fusermount', '-uz', test_mount], timeout=1, capture_output=True)
-                os.rmdir(test_mount)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-                logger.info("Detected LittleFS parameters for %s: %s", device_path, params)
-                return {
-                    'success': True,
-                    'params': params
-                }
-            except OSError:
-                # Mount failed, cleanup and try next config
-                if proc.poll() is None:
-                    proc.terminate()
-                subprocess.run(['fusermount', '-uz', test_mount], timeout=1, capture_output=True)
+        # A probe gets as long as a real mount would, within the detection
+        # deadline, and gives up early if a sibling probe already succeeded
+        timeout = min(config.MOUNT_TIMEOUT, deadline - time.monotonic())
+        if wait_for_mount(test_mount, proc, timeout, cancelled):
+            return params
+        return None
+
+    except Exception as e:
+        logger.debug("Detection attempt %d failed: %s", index, e)
+        return None
 
-            # Cleanup
+    finally:
+        if proc is not None:
+            stop_process(proc)
+        if test_mount is not None:
+            try:
+                subprocess.run(['fusermount', '-uz', test_mount], timeout=1, capture_output=True)
+            except (OSError, subprocess.SubprocessError):
+                pass
             try:
                 os.rmdir(test_mount)
             except OSError:
                 pass
 
-        except Exception as e:
-            logger.debug("Detection attempt %d failed: %s", i, e)
-            # Cleanup on exception
+
+def detect_littlefs_params(device_path: str) -> Dict[str, Any]:
+    """Auto-detect LittleFS parameters, sharing any detection already running
+
+    A second request in this process for a device that is already being
+    probed (e.g. a mount issued while /api/detect is still running) waits
+    for that result instead of starting another round of test mounts on
+    the same device. Sharing is per process: other workers run their own
+    detection, on their own private test mount points.
+
+    Args:
+        device_path: Path to the block device
+
+    Returns:
+        Dictionary with 'success' boolean and either 'params' or 'error'
+    """
+    with _detection_lock:
+        future = _detections_in_flight.get(device_path)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _detections_in_flight[device_path] = future
+
+    if not is_owner:
+        logger.info("Waiting for detection already running on %s", device_path)
+        return future.result()
+
+    try:
+        result = run_littlefs_detection(device_path)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _detection_lock:
+            del _detections_in_flight[device_path]
+
+
+def get_device_erase_size(device_path: str) -> Optional[int]:
+    """Read the erase/physical block size the kernel reports for a device
+
+    For MTD block devices this is the flash erase size, which is what
+    littlefs normally uses as its block size. For other block devices it
+    is the queue's physical block size (of the parent disk for partitions).
+
+    Args:
+        device_path: Path to the block device
+
+    Returns:
+        Size in bytes, or None if it could not be read
+    """
+    name = os.path.basename(device_path)
+
+    if name.startswith('mtdblock'):
+        value = read_sysfs_attr(f"/sys/class/mtd/mtd{name[len('mtdblock'):]}/erasesize")
+    else:
+        sys_dir = os.path.realpath(os.path.join('/sys/class/block', name))
+        if not os.path.isdir(os.path.join(sys_dir, 'queue')):
+            # Partitions share the queue of the disk they live on
+            sys_dir = os.path.dirname(sys_dir)
+        value = read_sysfs_attr(os.path.join(sys_dir, 'queue', 'physical_block_size'))
+
+    return int(value) if value.isdigit() else None
+
+
+def read_superblock_block_size(device_path: str) -> Optional[int]:
+    """Read the block size recorded in a littlefs v2 superblock
+
+    The superblock is the first entry of the metadata pair in blocks 0 and
+    1. Block 0 starts at offset 0 whatever the block size; block 1 is
+    checked at each candidate block size in case block 0 was mid-erase.
+
+    Args:
+        device_path: Path to the block device
+
+    Returns:
+        The block size in bytes, or None if no valid superblock was found
+    """
+    try:
+        fd = os.open(device_path, os.O_RDONLY)
+    except OSError as e:
+        logger.debug("Could not open %s to read superblock: %s", device_path, e)
+        return None
+
+    try:
+        offsets = [0] + sorted({params['block_size'] for params in config.COMMON_CONFIGS})
+        for offset in offsets:
             try:
-                subprocess.run(['fusermount', '-uz', test_mount], timeout=1, capture_output=True)
-                os.rmdir(test_mount)
+                header = os.pread(fd, LFS_SUPERBLOCK_HEADER_SIZE, offset)
             except OSError:
-                pass
-            continue
+                continue
+            if len(header) < LFS_SUPERBLOCK_HEADER_SIZE:
+                continue
+            if header[LFS_MAGIC_OFFSET:LFS_MAGIC_OFFSET + len(LFS_MAGIC)] != LFS_MAGIC:
+                continue
+
+            version, block_size, _ = LFS_SUPERBLOCK_STRUCT.unpack_from(header, LFS_SUPERBLOCK_STRUCT_OFFSET)
+            # Block 1 only counts if it sits where its own block size says
+            if offset and block_size != offset:
+                continue
+            if version >> 16 == LFS_DISK_VERSION_MAJOR and block_size > 0:
+                logger.info("Superblock on %s records block size %d", device_path, block_size)
+                return block_size
+    finally:
+        os.close(fd)
+
+    return None
+
+
+def split_by_block_size(candidates: List[Tuple[int, Dict[str, int]]]
+                        ) -> List[List[Tuple[int, Dict[str, int]]]]:
+    """Split candidates into one representative per block size and the rest
+
+    The on-disk format depends on the block size, not on the read and prog
+    sizes, so one configuration per block size is usually enough to find
+    a filesystem. The others are only worth probing if none of those mount.
+
+    Args:
+        candidates: (probe index, params) pairs, in order of preference
+
+    Returns:
+        Non-empty rounds: the first configuration seen for each block size,
+        then the remaining ones
+    """
+    representatives = []
+    rest = []
+    seen_block_sizes = set()
+    for candidate in candidates:
+        block_size = candidate[1]['block_size']
+        if block_size in seen_block_sizes:
+            rest.append(candidate)
+        else:
+            seen_block_sizes.add(block_size)
+            representatives.append(candidate)
+    return [r for r in (representatives, rest) if r]
+
+
+def order_probe_candidates(device_path: str) -> List[List[Tuple[int, Dict[str, int]]]]:
+    """Split the candidate configurations into probe rounds for a device
+
+    If the device holds a readable littlefs superblock, only configurations
+    with the block size it records are probed. Otherwise configurations
+    whose block size matches the size the device reports are preferred.
+    Either way one configuration per block size is probed first, and the
+    rest only if none of those mount.
+
+    Args:
+        device_path: Path to the block device
+
+    Returns:
+        List of rounds, each a list of (probe index, params) pairs
+    """
+    candidates = list(enumerate(config.COMMON_CONFIGS, 1))
+
+    # A readable superblock settles the block size outright; configurations
+    # with any other block size are rejected by lfs_mount anyway
+    block_size = read_superblock_block_size(device_path)
+    if block_size is not None:
+        matching = [c for c in candidates if c[1]['block_size'] == block_size]
+        if not matching:
+            params = {'block_size': block_size, **LFS_FALLBACK_GEOMETRY}
+            if is_valid_lfs_geometry(params):
+                matching = [(len(candidates) + 1, params)]
+        if matching:
+            return split_by_block_size(matching)
+
+    # The sort is stable, so each block size keeps its configured order
+    erase_size = get_device_erase_size(device_path)
+    candidates.sort(key=lambda c: c[1]['block_size'] != erase_size)
+    return split_by_block_size(candidates)
+
+
+def probe_littlefs_configs(device_path: str, candidates: List[Tuple[int, Dict[str, int]]],
+                           deadline: float) -> Optional[Dict[str, int]]:
+    """Probe several configurations concurrently and return the first that mounts
+
+    Args:
+        device_path: Path to the block device
+        candidates: (probe index, params) pairs to try
+        deadline: time.monotonic() value after which detection gives up
+
+    Returns:
+        The parameters of the first successful probe, or None
+    """
+    cancelled = threading.Event()
+    max_workers = max(1, min(config.DETECTION_WORKERS, len(candidates)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(probe_littlefs_config, device_path, params, i, cancelled, deadline)
+            for i, params in candidates
+        ]
+
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                params = future.result()
+                if params is not None:
+                    return params
+        except FuturesTimeoutError:
+            logger.warning("LittleFS detection for %s hit its deadline", device_path)
+        finally:
+            # Wake the running probes and drop the queued ones
+            cancelled.set()
+            for pending in futures:
+                pending.cancel()
+
+    return None
+
+
+def run_littlefs_detection(device_path: str) -> Dict[str, Any]:
+    """Auto-detect LittleFS parameters by trying to mount with common configs
+
+    One configuration per block size is probed first, preferring the
+    device's reported block size; the rest follow only if none mount.
+    Within a round all configurations are probed concurrently and the
+    first one that mounts wins; the remaining probes are cancelled and
+    cleaned up.
+
+    Args:
+        device_path: Path to the block device
+
+    Returns:
+        Dictionary with 'success' boolean and either 'params' or 'error'
+    """
+    try:
+        get_lfs_path()
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return {'success': False, 'error': str(e)}
+
+    # One deadline for the whole detection, however many rounds it takes
+    deadline = time.monotonic() + config.DETECTION_DEADLINE
+
+    for candidates in order_probe_candidates(device_path):
+        if time.monotonic() >= deadline:
+            break
+        params = probe_littlefs_configs(device_path, candidates, deadline)
+        if params is not None:
+            logger.info("Detected LittleFS parameters for %s: %s", device_path, params)
+            return {
+                'success': True,
+                'params': params
+            }
 
     logger.warning("Could not detect LittleFS parameters for %s", device_path)
     return {
@@ -379,63 +1434,81 @@ def try_mount_littlefs(device_path: str, mount_point: str) -> Dict[str, Any]:
     """
     ensure_mount_dir()
 
-    # Clean up any stale mount point
-    if os.path.exists(mount_point):
-        if not force_cleanup_mount_point(mount_point):
-            error_msg = f'Could not clean up stale mount point at {mount_point}'
-            logger.error(error_msg)
-            return {'success': False, 'error': error_msg}
-
-    # Create mount point
+    # Create the mount point under a private name and rename it into place.
+    # The rename also replaces an empty leftover directory atomically, so
+    # the full cleanup only runs when something is really in the way (a
+    # stale mount or leftover files)
     try:
-        os.makedirs(mount_point, exist_ok=False)
-    except FileExistsError:
-        error_msg = f'Mount point still exists after cleanup: {mount_point}'
-        logger.error(error_msg)
-        return {'success': False, 'error': error_msg}
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=config.MOUNT_BASE)
     except Exception as e:
         error_msg = f'Could not create mount point: {str(e)}'
         logger.error(error_msg)
         return {'success': False, 'error': error_msg}
 
+    try:
+        os.rename(staging, mount_point)
+    except OSError:
+        try:
+            os.rmdir(staging)
+        except OSError:
+            pass
+
+        if not force_cleanup_mount_point(mount_point):
+            error_msg = f'Could not clean up stale mount point at {mount_point}'
+            logger.error(error_msg)
+            return {'success': False, 'error': error_msg}
+
+        try:
+            os.makedirs(mount_point, exist_ok=False)
+        except FileExistsError:
+            error_msg = f'Mount point still exists after cleanup: {mount_point}'
+            logger.error(error_msg)
+            return {'success': False, 'error': error_msg}
+        except Exception as e:
+            error_msg = f'Could not create mount point: {str(e)}'
+            logger.error(error_msg)
+            return {'success': False, 'error': error_msg}
+
+    # Reuse the parameters from an earlier mount of this device: detection
+    # test-mounts every candidate, so it dominates the cost of reconnecting
+    params = detected_params.get(device_path)
+    if params is not None:
+        result = mount_littlefs(device_path, mount_point, params)
+        if result['success']:
+            return result
+        logger.info("Remembered parameters no longer mount %s, detecting again", device_path)
+        detected_params.pop(device_path, None)
+
     # Auto-detect parameters
     detection = detect_littlefs_params(device_path)
 
     if not detection['success']:
         return {'success': False, 'error': 'Could not detect LittleFS parameters'}
 
-    params = detection['params']
+    result = mount_littlefs(device_path, mount_point, detection['params'])
+    if result['success']:
+        detected_params[device_path] = result['params']
+    return result
+
+
+def mount_littlefs(device_path: str, mount_point: str, params: Dict[str, int]) -> Dict[str, Any]:
+    """Mount a littlefs filesystem with known parameters
+
+    Args:
+        device_path: Path to the block device
+        mount_point: Existing directory to mount the filesystem on
+        params: LittleFS configuration to mount with
 
-    # Mount with detected parameters
+    Returns:
+        Dictionary with 'success' boolean and either 'params'/'process' or 'error'
+    """
     try:
-        cmd = [
-            'lfs',
-            f'--block_size={params["block_size"]}',
-            f'--read_size={params["read_size"]}',
-            f'--prog_size={params["prog_size"]}',
-            f'--cache_size={params.get("cache_size", 64)}',
-            f'--lookahead_size={params.get("lookahead_size", 32)}',
-            '-o', 'allow_other',
-            device_path,
-            mount_point
-        ]
+        cmd = build_lfs_command(device_path, mount_point, params)
 
         proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        time.sleep(config.MOUNT_TIMEOUT)
-
-        # Verify mount succeeded by checking accessibility
-        # FUSE can daemonize (exit with code 0) or stay running
-        mount_success = False
-        for attempt in range(5):
-            try:
-                os.listdir(mount_point)
-                mount_success = True
-                break
-            except OSError:
-                if attempt < 4:
-                    time.sleep(0.2)
 
-        if mount_success:
+        output = bytearray()
+        if wait_for_mount(mount_point, proc, config.MOUNT_TIMEOUT, output=output):
             logger.info("Successfully mounted %s at %s", device_path, mount_point)
             return {
                 'success': True,
@@ -443,11 +1516,12 @@ def try_mount_littlefs(device_path: str, mount_point: str) -> Dict[str, Any]:
                 'process': proc
             }
 
-        # Mount failed
-        if proc.poll() is None:
-            proc.terminate()
+        # Mount failed; reaping lfs also guarantees its stderr reaches EOF
+        stop_process(proc)
 
-        stderr = proc.stderr.read().decode() if proc.stderr else ''
+        if proc.stderr:
+            output.extend(proc.stderr.read())
+        stderr = output.decode(errors='replace')
         error_msg = 'Mount failed'
         if stderr:
             error_msg += f': {stderr.strip()}'
@@ -461,33 +1535,91 @@ def try_mount_littlefs(device_path: str, mount_point: str) -> Dict[str, Any]:
         return {'success': False, 'error': error_msg}
 
 
-def get_directory_listing(path: str) -> List[Dict[str, Any]]:
-    """Get files and directories at path
+@functools.lru_cache(maxsize=4096)
+def format_mtime(minute: int) -> str:
+    """Format a modification time, which listings show to the minute
+
+    Files in a directory tend to share modification minutes, and the same
+    directories get listed repeatedly, so results are cached across
+    listings.
 
     Args:
-        path: Directory path to list
+        minute: Modification time in whole minutes since the epoch
 
     Returns:
-        List of file/directory information dictionaries
+        Local time string (e.g., "2024-01-31 12:05")
+    """
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(minute * 60))
+
+
+def describe_dir_entry(entry: os.DirEntry, is_dir: bool) -> Dict[str, Any]:
+    """Build the listing dictionary for a directory entry
+
+    Args:
+        entry: Directory entry from os.scandir
+        is_dir: Whether the entry is a directory, as seen when sorting
+
+    Returns:
+        File/directory information dictionary
+    """
+    # One stat per entry: every extra call is a FUSE round-trip. It is
+    # still needed for directories, which also show a modified time
+    st = entry.stat(follow_symlinks=False)
+    return {
+        'name': entry.name,
+        'type': 'dir' if is_dir else 'file',
+        'size': '-' if is_dir else format_size(st.st_size),
+        'modified': format_mtime(int(st.st_mtime // 60)),
+        'path': entry.path
+    }
+
+
+def iter_directory_listing(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield files and directories at path, directories first
+
+    The directory is read once up front and ordered using the entry types
+    reported by readdir. The entries are then stat'ed on a small thread
+    pool, a bounded window at a time, so several FUSE round-trips are in
+    flight at once on a cold cache, and emitted in order as their stats
+    complete.
+
+    Args:
+        path: Directory path to list
+
+    Yields:
+        File/directory information dictionaries
     """
-    items = []
     try:
-        for entry in os.scandir(path):
-            stat = entry.stat()
-            items.append({
-                'name': entry.name,
-                'type': 'dir' if entry.is_dir() else 'file',
-                'size': format_size(stat.st_size) if entry.is_file() else '-',
-                'modified': time.strftime(
-                    '%Y-%m-%d %H:%M',
-                    time.localtime(stat.st_mtime)
-                ),
-                'path': entry.path
-            })
+        # Decorate each entry with its sort key once; the type comes from
+        # readdir's d_type and is reused for the listing itself
+        with os.scandir(path) as it:
+            decorated = [
+                (entry.is_dir(follow_symlinks=False), entry.name.lower(), entry)
+                for entry in it
+            ]
+        decorated.sort(key=lambda d: (not d[0], d[1]))
+
+        # Only a bounded window of stats is queued ahead of the client, so
+        # a disconnect leaves little work behind, and that is cancelled
+        executor = ThreadPoolExecutor(max_workers=config.LISTING_WORKERS)
+        window = collections.deque()
+        try:
+            for is_dir, _, entry in decorated:
+                window.append(executor.submit(describe_dir_entry, entry, is_dir))
+                if len(window) >= config.LISTING_WORKERS * 2:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
+            executor.shutdown(wait=False)
     except Exception as e:
         logger.error("Error listing directory %s: %s", path, e)
 
-    return sorted(items, key=lambda x: (x['type'] != 'dir', x['name'].lower()))
+
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+SIZE_DIVISORS = tuple(1 << (10 * i) for i in range(len(SIZE_UNITS)))
 
 
 def format_size(size: float) -> str:
@@ -499,30 +1631,40 @@ def format_size(size: float) -> str:
     Returns:
         Human-readable size string (e.g., "1.5 MB")
     """
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024:
-            return f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} TB"
+    # Each unit is 2**10 times the last, so the bit length picks it directly
+    exp = min(max(int(size).bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    return f"{size / SIZE_DIVISORS[exp]:.1f} {SIZE_UNITS[exp]}"
 
 
-# HTML Template - loaded lazily to handle missing file gracefully
-_html_template: Optional[str] = None
+# HTML Template - loaded and compiled lazily to handle missing file gracefully
+_html_template: Optional[Template] = None
 
 
-def load_template() -> str:
-    """Load HTML template with error handling"""
+def load_template() -> Template:
+    """Load and compile the HTML template once, with error handling"""
     global _html_template
     if _html_template is None:
         try:
             with open('templates/index.html', 'r') as f:
-                _html_template = f.read()
+                _html_template = app.jinja_env.from_string(f.read())
         except FileNotFoundError:
             logger.error("Template file not found: templates/index.html")
             raise
     return _html_template
 
 
+@functools.lru_cache(maxsize=1)
+def render_old_page() -> str:
+    """Render the old template-based page once
+
+    The template takes no context, so every request gets the same HTML.
+
+    Returns:
+        Rendered HTML page
+    """
+    return load_template().render()
+
+
 # Routes
 
 @app.route('/')
@@ -533,7 +1675,11 @@ def index():
 @app.route('/old')
 def old_index():
     """Render the old template-based page"""
-    return render_template_string(load_template())
+    response = Response(render_old_page(), mimetype='text/html')
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route('/api/devices')
@@ -553,6 +1699,8 @@ def api_detect():
         return jsonify({'success': False, 'error': ERROR_INVALID_DEVICE_PATH}), 400
 
     result = detect_littlefs_params(device_path)
+    if result['success']:
+        detected_params[device_path] = result['params']
     return jsonify(result)
 
 
@@ -565,26 +1713,30 @@ def api_mount():
     if not device_path or not os.path.exists(device_path):
         return jsonify({'success': False, 'error': ERROR_INVALID_DEVICE_PATH}), 400
 
-    if device_path in active_mounts:
-        return jsonify({'success': False, 'error': ERROR_DEVICE_ALREADY_MOUNTED}), 400
-
     mount_name = os.path.basename(device_path)
     mount_point = os.path.join(config.MOUNT_BASE, mount_name)
 
-    result = try_mount_littlefs(device_path, mount_point)
+    # Claiming is atomic across workers, unlike a lookup followed by an insert
+    if not active_mounts.claim(device_path, mount_point):
+        return jsonify({'success': False, 'error': ERROR_DEVICE_ALREADY_MOUNTED}), 400
+
+    # The claim must be released whatever goes wrong, or the device would
+    # stay "already mounted" until the worker restarts
+    try:
+        result = try_mount_littlefs(device_path, mount_point)
+    except Exception as e:
+        logger.error("Mount error for %s: %s", device_path, e)
+        result = {'success': False, 'error': f'Mount error: {str(e)}'}
 
     if result['success']:
-        active_mounts[device_path] = {
-            'mount_point': mount_point,
-            'params': result['params'],
-            'process': result['process']
-        }
+        active_mounts.activate(device_path, mount_point, result['params'])
         return jsonify({
             'success': True,
             'mount_point': mount_point,
             'params': result['params']
         })
     else:
+        active_mounts.remove(device_path)
         try:
             os.rmdir(mount_point)
         except Exception:
@@ -598,24 +1750,19 @@ def api_unmount():
     data = request.json
     device_path = data.get('device')
 
-    if device_path not in active_mounts:
+    mount_info = active_mounts.get(device_path)
+    if mount_info is None:
         return jsonify({'success': False, 'error': ERROR_DEVICE_NOT_MOUNTED}), 400
 
-    mount_info = active_mounts[device_path]
     mount_point = mount_info['mount_point']
 
-    if 'process' in mount_info:
-        try:
-            mount_info['process'].terminate()
-        except Exception:
-            pass
-
+    # Unmounting makes the daemonized lfs process exit on its own
     if unmount_fuse(mount_point):
         try:
             os.rmdir(mount_point)
         except Exception:
             pass
-        del active_mounts[device_path]
+        active_mounts.remove(device_path)
         logger.info("Unmounted device: %s", device_path)
         return jsonify({'success': True})
     else:
@@ -628,21 +1775,33 @@ def api_list():
     device_path = request.args.get('device')
     subpath = request.args.get('path', '')
 
-    if device_path not in active_mounts:
+    mount_info = active_mounts.get(device_path)
+    if mount_info is None:
         return jsonify({'success': False, 'error': ERROR_DEVICE_NOT_MOUNTED}), 400
 
-    mount_point = active_mounts[device_path]['mount_point']
+    mount_point = mount_info['mount_point']
     full_path = os.path.join(mount_point, subpath.lstrip('/'))
 
     if not os.path.exists(full_path):
         return jsonify({'success': False, 'error': ERROR_PATH_NOT_FOUND}), 404
 
-    items = get_directory_listing(full_path)
-    return jsonify({
-        'success': True,
-        'items': items,
-        'path': subpath or '/'
-    })
+    def generate():
+        # Same document shape as before, emitted a batch of entries at a
+        # time so a large directory isn't one chunk write per entry
+        yield '{"success":true,"path":%s,"items":[' % JSON_ENCODER.encode(subpath or '/')
+        batch = []
+        separator = ''
+        for item in iter_directory_listing(full_path):
+            batch.append(JSON_ENCODER.encode(item))
+            if len(batch) == config.LIST_BATCH_SIZE:
+                yield separator + ','.join(batch)
+                batch = []
+                separator = ','
+        if batch:
+            yield separator + ','.join(batch)
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/download')
@@ -651,49 +1810,57 @@ def api_download():
     device_path = request.args.get('device')
     file_path = request.args.get('path')
 
-    if device_path not in active_mounts:
+    mount_info = active_mounts.get(device_path)
+    if mount_info is None:
         return jsonify({'success': False, 'error': ERROR_DEVICE_NOT_MOUNTED}), 400
 
-    mount_point = active_mounts[device_path]['mount_point']
+    mount_point = mount_info['mount_point']
     full_path = os.path.join(mount_point, file_path.lstrip('/'))
 
     if not os.path.exists(full_path) or not os.path.isfile(full_path):
         return jsonify({'success': False, 'error': ERROR_FILE_NOT_FOUND}), 404
 
-    # Create a temporary copy with correct ownership
-    try:
-        import tempfile
-        temp_dir = tempfile.mkdtemp()
-        temp_file = os.path.join(temp_dir, os.path.basename(full_path))
-        shutil.copy2(full_path, temp_file)
+    download_name = os.path.basename(full_path)
 
-        # Fix ownership of the temp file
-        sudo_uid = os.environ.get('SUDO_UID')
-        sudo_gid = os.environ.get('SUDO_GID')
-        if sudo_uid and sudo_gid:
-            os.chown(temp_file, int(sudo_uid), int(sudo_gid))
-            os.chown(temp_dir, int(sudo_uid), int(sudo_gid))
-
-        # Send the file and clean up temp directory after
-        response = send_file(
-            temp_file,
-            as_attachment=True,
-            download_name=os.path.basename(full_path)
+    # Behind nginx, hand the transfer to the front-end server so the file
+    # bytes never pass through Python
+    if config.X_ACCEL_REDIRECT_PREFIX:
+        relative_path = os.path.relpath(full_path, config.MOUNT_BASE)
+        response = Response(mimetype='application/octet-stream')
+        response.headers['X-Accel-Redirect'] = quote(
+            f"{config.X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path}"
+        )
+        response.headers['Content-Disposition'] = (
+            f"attachment; filename*=UTF-8''{quote(download_name)}"
         )
-
-        # Schedule cleanup (temp dir will be cleaned by OS eventually if we don't)
-        import atexit
-        atexit.register(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
-
         return response
-    except Exception as e:
-        logger.error("Error preparing download: %s", e)
-        # Fallback to direct send if temp copy fails
-        return send_file(
-            full_path,
-            as_attachment=True,
-            download_name=os.path.basename(full_path)
+
+    # Only downloads are handed off; Flask's app-wide USE_X_SENDFILE would
+    # also send the UI's own files by path
+    if config.X_SENDFILE:
+        response = Response(mimetype='application/octet-stream')
+        response.headers['X-Sendfile'] = full_path
+        response.headers['Content-Disposition'] = (
+            f"attachment; filename*=UTF-8''{quote(download_name)}"
         )
+        return response
+
+    # A large read buffer makes each FUSE read upcall fetch up to 1 MiB
+    # instead of the 8 KiB chunks the WSGI file wrapper asks for
+    st = os.stat(full_path)
+    fh = open(full_path, 'rb', buffering=config.DOWNLOAD_BUFFER_SIZE)
+    response = send_file(
+        fh,
+        as_attachment=True,
+        download_name=download_name,
+        last_modified=st.st_mtime,
+        etag=f"{st.st_mtime}-{st.st_size}",
+        conditional=False
+    )
+
+    # send_file cannot size a file object, so range support is set up here
+    response.content_length = st.st_size
+    return response.make_conditional(request, accept_ranges=True, complete_length=st.st_size)
 
 
 def fix_ownership(path: str) -> None:
@@ -726,6 +1893,130 @@ def fix_ownership(path: str) -> None:
         logger.warning("Could not fix ownership of %s: %s", path, e)
 
 
+def apply_stat(fd_or_path: Union[int, str], src_stat: os.stat_result) -> None:
+    """Copy permission bits and timestamps from a source stat result
+
+    Args:
+        fd_or_path: Open file descriptor or path of the copy
+        src_stat: Stat result of the original
+    """
+    os.chmod(fd_or_path, stat.S_IMODE(src_stat.st_mode))
+    os.utime(fd_or_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+
+def fast_copy(src: str, dst: str, src_stat: Optional[os.stat_result] = None) -> None:
+    """Copy a file off a mounted device along with its mode and timestamps
+
+    Tries the in-kernel copies first: copy_file_range, then sendfile, both
+    of which skip the userspace bounce buffer. Whatever they leave is
+    finished with a read/write loop using a large buffer, so each FUSE read
+    upcall moves as much data as possible.
+
+    Args:
+        src: Source file path
+        dst: Destination file path (created or truncated)
+        src_stat: Stat result for src if the caller already has one
+    """
+    if src_stat is None:
+        src_stat = os.stat(src)
+
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            # Each copy advances the file offsets, so a later method simply
+            # carries on where an unsupported one stopped
+            unsupported = (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL)
+
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    while os.copy_file_range(src_fd, dst_fd, config.COPY_BUFFER_SIZE):
+                        pass
+                except OSError as e:
+                    # Cross-filesystem copies are refused on newer kernels
+                    if e.errno not in unsupported:
+                        raise
+
+            if hasattr(os, 'sendfile'):
+                try:
+                    while os.sendfile(dst_fd, src_fd, None, config.COPY_BUFFER_SIZE):
+                        pass
+                except OSError as e:
+                    if e.errno not in unsupported:
+                        raise
+
+            # Copies whatever the kernel copies did not (usually nothing)
+            while True:
+                chunk = os.read(src_fd, config.COPY_BUFFER_SIZE)
+                if not chunk:
+                    break
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(dst_fd, view):]
+
+            apply_stat(dst_fd, src_stat)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def extract_tree(src_dir: str, dest_dir: str) -> Tuple[int, int]:
+    """Copy a directory tree off a mounted device
+
+    The source is walked once with os.scandir to create the directories
+    and collect the files. Each entry's stat is reused for the totals and
+    for the copies' modes and timestamps, so the mount is not stat'ed
+    again. The file copies then run on a thread pool, largest first, so
+    several FUSE reads are in flight at once.
+
+    Args:
+        src_dir: Directory on the mounted filesystem to copy from
+        dest_dir: Local directory to copy into (created if missing)
+
+    Returns:
+        Tuple of (number of files copied, total bytes copied)
+    """
+    total_size = 0
+    copied_dirs = []
+    files = []
+    pending = [(src_dir, dest_dir)]
+
+    while pending:
+        src, dst = pending.pop()
+        os.makedirs(dst, exist_ok=True)
+
+        with os.scandir(src) as it:
+            for entry in it:
+                target = os.path.join(dst, entry.name)
+                st = entry.stat(follow_symlinks=False)
+                if stat.S_ISDIR(st.st_mode):
+                    pending.append((entry.path, target))
+                    copied_dirs.append((target, st))
+                else:
+                    files.append((entry.path, target, st))
+                    total_size += st.st_size
+
+    # Start the largest files first so one big file picked up last doesn't
+    # leave the other workers idle while it finishes
+    files.sort(key=lambda f: f[2].st_size, reverse=True)
+    src_files, dst_files, src_stats = zip(*files) if files else ((), (), ())
+
+    with ThreadPoolExecutor(max_workers=config.EXTRACT_WORKERS) as executor:
+        # Consuming the results re-raises the first failed copy
+        for _ in executor.map(fast_copy, src_files, dst_files, src_stats):
+            pass
+
+    # Directory timestamps change while they are filled, so copy them last
+    for dst, st in reversed(copied_dirs):
+        apply_stat(dst, st)
+
+    return len(src_files), total_size
+
+
 @app.route('/api/extract-all', methods=['POST'])
 def api_extract_all():
     """Extract all files from mounted device to local filesystem"""
@@ -736,38 +2027,18 @@ def api_extract_all():
         os.path.expanduser(config.DEFAULT_EXPORT_PATH)
     )
 
-    if device_path not in active_mounts:
+    mount_info = active_mounts.get(device_path)
+    if mount_info is None:
         return jsonify({'success': False, 'error': ERROR_DEVICE_NOT_MOUNTED}), 400
 
-    mount_point = active_mounts[device_path]['mount_point']
+    mount_point = mount_info['mount_point']
 
     try:
-        os.makedirs(dest_path, exist_ok=True)
+        file_count, total_size = extract_tree(mount_point, dest_path)
 
-        # Fix ownership of destination directory
+        # Fix ownership of everything in one pass once the copy is done
         fix_ownership(dest_path)
 
-        file_count = 0
-        total_size = 0
-
-        for item in os.listdir(mount_point):
-            src = os.path.join(mount_point, item)
-            dst = os.path.join(dest_path, item)
-
-            if os.path.isdir(src):
-                shutil.copytree(src, dst, dirs_exist_ok=True)
-                # Count files in directory
-                for root, dirs, files in os.walk(dst):
-                    for f in files:
-                        file_count += 1
-                        total_size += os.path.getsize(os.path.join(root, f))
-                fix_ownership(dst)
-            else:
-                shutil.copy2(src, dst)
-                file_count += 1
-                total_size += os.path.getsize(dst)
-                fix_ownership(dst)
-
         logger.info("Extracted all files from %s to %s", device_path, dest_path)
         return jsonify({
             'success': True,
@@ -806,4 +2077,4 @@ if __name__ == '__main__':
     ensure_mount_dir()
     cleanup_stale_mounts()
     logger.info("LittleFS Browser starting...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=config.DEBUG, host='0.0.0.0', port=5000)